@@ -14,14 +14,17 @@ import sys
 import os
 import pty
 import select
+import selectors
 import termios
 import tty
 import signal
 import re
+import codecs
 import time
 import fcntl
 import struct
 import shutil
+import zlib
 from typing import Optional
 from datetime import datetime
 from pathlib import Path
@@ -37,7 +40,8 @@ BOLD = '\033[1m'
 Winsize = tuple[int, int]
 
 # Pattern to strip ANSI escape codes for pattern matching
-# Handles standard CSI, DEC private mode (\x1b[?...), and OSC sequences (\x1b]...\x07)
+# Handles standard CSI, DEC private mode (\x1b[?...), OSC sequences (\x1b]...\x07)
+# and the single-character 8-bit CSI introducer (U+009B)
 ANSI_ESCAPE = re.compile(
     r'\x1b'                         # ESC
     r'(?:'
@@ -47,8 +51,104 @@ ANSI_ESCAPE = re.compile(
     r'|'
     r'\][^\x1b]*\x1b\\'             # OSC sequences (terminated by ST)
     r')'
+    r'|'
+    r'\x9b[?!>]*[0-9;]*[a-zA-Z<>~]'  # 8-bit CSI sequences
 )
 
+def decode_c1_csi(error: UnicodeDecodeError) -> tuple[str, int]:
+    """Decode error handler that keeps a lone 0x9B byte as U+009B.
+
+    Terminals using 8-bit controls send CSI as that single raw byte, which is
+    invalid UTF-8; 'replace' would turn it into U+FFFD and ANSI_ESCAPE could not
+    strip the sequence. 0x9B inside a valid character (e.g. 'ě', C4 9B) never
+    reaches the handler. Every other error is replaced like 'replace' does.
+    """
+    if error.object[error.start:error.end] == b'\x9b':
+        return '\x9b', error.end
+    return '\ufffd', error.end
+
+# Error handler name for decoding PTY output
+C1_CSI_DECODE_ERRORS = 'autoyes-c1-csi'
+codecs.register_error(C1_CSI_DECODE_ERRORS, decode_c1_csi)
+
+# Patterns that indicate the command is asking for approval
+# These work with Claude, Terraform, kubectl, and many other tools.
+# Compiled once at import and shared by every AutoYes instance.
+MENU_PREFIX = r'(?:[›❯>➤•*]\s*)?'
+# NOTE: In raw terminal mode, Enter sends \r (carriage return), not \n (line feed)
+# TUIs expect \r for Enter key presses
+# Only whether a pattern matches is used, so each one ends as soon as the prompt
+# is identified instead of also consuming optional trailing text.
+APPROVAL_PATTERNS: tuple[tuple[re.Pattern, bytes, str], ...] = (
+    # Numbered menu format (Claude, many CLI tools): "1. Yes" / "2. No" (optional 3rd option)
+    # NOTE: Must require BOTH "1. Yes" AND "2. No" to avoid premature matching when
+    # the menu is rendered incrementally (TUIs often send "1. Yes" before "2. No")
+    # The leading menu marker is left out: search() finds the same prompts without
+    # it, and starting with a literal lets re skip ahead instead of trying the
+    # optional prefix at every position.
+    (re.compile(rf'1[\.)]\s*Yes\s+{MENU_PREFIX}2[\.)]\s*No', re.IGNORECASE), b'\r', "pressing Enter"),
+    # Generic approval prompts with yes/no options (e.g., "Continue? (y/n)")
+    # The leading lookahead lets re reject most positions with one character
+    # class test before trying every keyword of the alternation.
+    (re.compile(r'(?=[dcpa])(?:Do you want to|Continue|Proceed|Approve|Confirm|Are you sure)\b[^\n]*?(?:\n\s*)?(?:[(\[]\s*)?y(?:es\s*/\s*no|\s*/\s*n)', re.IGNORECASE), b'y\r', "sending 'y' + Enter"),
+    # Terraform style: "Enter a value:"
+    (re.compile(r'Enter a value:\s*$', re.IGNORECASE | re.MULTILINE), b'yes\r', "sending 'yes' + Enter"),
+)
+RELAXED_APPROVAL_PATTERNS: tuple[tuple[re.Pattern, bytes, str], ...] = (
+    (re.compile(r'\?\s*(?:[(\[]\s*)?y(?:es)?\s*/\s*n', re.IGNORECASE), b'y\r', "sending 'y' + Enter (relaxed)"),
+    (re.compile(r'\bYes\s*/\s*No\b\s*/\s*[^\n]', re.IGNORECASE), b'y\r', "sending 'y' + Enter (relaxed)"),
+)
+# Every prompt the patterns above (and the numbered menu check) can match contains
+# one of these substrings once casefolded, so text without any of them is
+# rejected with a few substring scans instead of running every regex.
+# Keep them in step with the default patterns; they are not used once an
+# instance's patterns are overridden (see AutoYes.uses_default_patterns).
+# casefold() rather than lower() keeps this in line with re.IGNORECASE, which
+# also lets 'ſ' match 's'. "con" stands in for "Continue" and "Confirm": their
+# 'i' is left out because IGNORECASE matches a dotless 'ı' there as well.
+APPROVAL_HINTS = ('yes', 'enter a value', 'do you want to', 'con', 'proceed', 'approve', 'are you sure')
+RELAXED_APPROVAL_HINTS = APPROVAL_HINTS + ('?',)
+# The last character of every strict match: the 's' or 'o' ending a Yes/No
+# option, the 'n' or 'o' of y/n and yes/no, or the colon of "Enter a value:".
+# While none of them has arrived since the last check, a chunk is buffered but
+# left for the next check (the idle check also covers every strict pattern),
+# unless it may finish an escape sequence or character the buffer ended in.
+# Like APPROVAL_HINTS this only holds for the default patterns.
+PROMPT_FINAL_BYTES = (b'n', b'o', b's', b':', b'N', b'O', b'S')
+# Matched with finditer over the whole text, so whitespace must not cross lines
+NUMBERED_MENU_PATTERN = re.compile(
+    r'^[^\S\n]*(?P<selected>[›❯>➤•*])?[^\S\n]*(?P<number>\d+)[\.)][^\S\n]*(?P<label>Yes|No)\b',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Printable ASCII that repr() leaves as is; data made up only of these bytes
+# can be logged without escaping
+LOG_VERBATIM_BYTES = bytes(range(0x20, 0x7f)).replace(b'\\', b'').replace(b"'", b'')
+
+# Spinner characters commonly used by TUI apps
+SPINNER_CHARS = '⏺⏹⏸⏵⏴●○◐◑◒◓◴◵◶◷⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏▁▂▃▄▅▆▇█✓✗✳✴✵'
+# Deletes spinner characters and ASCII whitespace; a line that translates to
+# nothing but (Unicode) whitespace is an empty or spinner-only line
+SPINNER_STRIP_TABLE = str.maketrans('', '', SPINNER_CHARS + ' \t\v\f')
+
+def last_meaningful_lines(text: str, max_lines: int) -> str:
+    """Return the last max_lines lines of text that aren't empty or spinner-only.
+
+    Filtering out blank and spinner lines handles TUI animations that flood the
+    buffer and push the actual prompt out of view. Lines are walked backwards
+    from the end, so only the tail that is kept gets examined.
+    """
+    lines: list[str] = []
+    end = len(text)
+    while end > 0 and len(lines) < max_lines:
+        start = text.rfind('\n', 0, end) + 1
+        line = text[start:end]
+        if line.translate(SPINNER_STRIP_TABLE).strip():
+            lines.append(line)
+        end = start - 1
+    lines.reverse()
+    return '\n'.join(lines)
+
 def get_fd_winsize(fd: int) -> Optional[Winsize]:
     """Return terminal rows and columns for fd, ignoring unusable 0x0 sizes."""
     try:
@@ -78,6 +178,66 @@ def set_fd_winsize(fd: int, winsize: Optional[Winsize]) -> bool:
         return False
     return True
 
+def write_all(fd: int, buffers) -> None:
+    """Write every buffer to fd with as few writev() calls as possible.
+
+    os.write may accept only part of the data (e.g. a slow terminal); the
+    unwritten remainder is retried instead of being silently dropped.
+    """
+    views = [memoryview(buf) for buf in buffers if buf]
+    while views:
+        try:
+            written = os.writev(fd, views)
+        except BlockingIOError:
+            # Nonblocking fd (e.g. the PTY master) is full: wait until it drains
+            select.select([], [fd], [])
+            continue
+        while views and written >= views[0].nbytes:
+            written -= views.pop(0).nbytes
+        if written:
+            views[0] = views[0][written:]
+
+def utf8_sequence_length(lead: int) -> int:
+    """Return how many bytes the UTF-8 sequence starting with byte lead spans."""
+    if lead < 0xC0:
+        # ASCII, or a stray continuation byte that decodes on its own
+        return 1
+    if lead < 0xE0:
+        return 2
+    if lead < 0xF0:
+        return 3
+    return 4
+
+def complete_utf8_end(buffer: bytearray, start: int) -> int:
+    """Return where buffer's last complete UTF-8 character ends, looking no further back than start."""
+    end = len(buffer)
+    lead = end - 1
+    while lead > start and end - lead < 4 and 0x80 <= buffer[lead] < 0xC0:
+        lead -= 1
+    if lead >= start and utf8_sequence_length(buffer[lead]) > end - lead:
+        return lead
+    return end
+
+def discard(*_args) -> None:
+    """No-op stand-in for per-chunk logging methods whose log is disabled."""
+
+def open_read_selector(fileobjs) -> selectors.BaseSelector:
+    """Register fileobjs for reading with the platform's best selector.
+
+    epoll rejects regular files (e.g. stdin redirected from a file), so fall
+    back to select() when registration fails.
+    """
+    selector = selectors.DefaultSelector()
+    try:
+        for fileobj in fileobjs:
+            selector.register(fileobj, selectors.EVENT_READ)
+    except (OSError, ValueError):
+        selector.close()
+        selector = selectors.SelectSelector()
+        for fileobj in fileobjs:
+            selector.register(fileobj, selectors.EVENT_READ)
+    return selector
+
 def read_version() -> str:
     version_path = Path(__file__).resolve().with_name("VERSION")
     try:
@@ -89,21 +249,41 @@ class AutoYes:
     def __init__(self, command: list[str], enable_logging: bool = False):
         self.command = command
         self.auto_approve = True  # Start with auto-approve ON by default
-        self.buffer = ""  # Buffer to detect approval prompts
+        self.buffer = bytearray()  # Raw output bytes used to detect approval prompts
         self.master_fd: Optional[int] = None
         self.original_tty = None
         self.buffer_limit = 16384
+        # Output checks scan only bytes not yet scanned plus this much already-seen
+        # context, so a prompt split across reads is still matched as a whole
+        self.scan_overlap = 2048
+        self.unscanned_bytes = 0
+        self.unscanned_final_byte = False  # Whether unscanned bytes hold any of PROMPT_FINAL_BYTES
         self.read_chunk_size = 4096
-        self.idle_prompt_timeout = 0.75
-        self.response_delay = 0.3  # Increased delay for TUI to be ready for input
-        self.last_output_time = 0.0
-        self.last_idle_snapshot = ""
+        self.max_read_batch = 65536  # Most output bytes drained per wakeup before serving stdin
+        # Deadlines are integer nanoseconds from time.monotonic_ns()
+        self.idle_prompt_timeout_ns = 750_000_000
+        self.response_delay_ns = 300_000_000  # Increased delay for TUI to be ready for input
+        self.last_output_ns = 0
+        self.last_idle_hash: Optional[int] = None  # Checksum of the buffer tail at the last idle check
+        self.last_check = None  # (relaxed, last_lines, result) of the previous prompt check
         self.pending_response = None  # Response waiting to be sent after TUI settles
         self.use_status_line = sys.stderr.isatty() and os.environ.get("TERM") not in (None, "dumb")
         self.previous_sigwinch = None
+        self.stdin_fd: Optional[int] = None
+        self.stdout_fd: Optional[int] = None
+        self.wakeup_r: Optional[int] = None
+        self.wakeup_w: Optional[int] = None
+        self.previous_wakeup_fd = -1
+        self.previous_sigchld = None
+        self.previous_sigint = None
+        self.interrupted = False  # Set by handle_sigint, acted on by the event loop
+        self.waiting_for_events = False  # True only while run() is parked in the selector
+        self.child_status: Optional[int] = None
         
         # Logging setup
         self.enable_logging = enable_logging
+        self._log_second = -1
+        self._log_second_prefix = ""
         self.log_file = None
         self.stream_log_file = None
         self.stream_log_path: Optional[Path] = None
@@ -117,58 +297,125 @@ class AutoYes:
         if log_dir:
             self.stream_log_path = log_dir / "stream.log"
             try:
-                self.stream_log_file = open(self.stream_log_path, "ab", buffering=0)
+                # Buffered so a burst of small PTY reads becomes one write(); flushed
+                # whenever output goes quiet (see flush_logs)
+                self.stream_log_file = open(self.stream_log_path, "ab", buffering=65536)
             except OSError:
                 self.stream_log_file = None
 
             if self.enable_logging:
                 log_path = log_dir / "autoyes.log"
-                self.log_file = open(log_path, "a", encoding="utf-8", buffering=1)  # Line buffered
+                # Buffered like the stream log; flush_logs() writes it out when output goes quiet
+                self.log_file = open(log_path, "a", encoding="utf-8", buffering=65536)
                 self.log(f"\n{'='*80}\n")
                 self.log(f"AutoYes session started: {datetime.now()}\n")
                 self.log(f"Command: {' '.join(command)}\n")
                 self.log(f"{'='*80}\n")
+
+        # These run for every PTY chunk; when their log is off, replace the
+        # method with a no-op so the hot path skips the call body entirely
+        if not self.enable_logging:
+            self.log_data = discard
+        if not self.stream_log_file:
+            self.log_stream_data = discard
         
-        # Patterns that indicate the command is asking for approval
-        # These work with Claude, Terraform, kubectl, and many other tools
-        menu_prefix = r'(?:[›❯>➤•*]\s*)?'
-        # NOTE: In raw terminal mode, Enter sends \r (carriage return), not \n (line feed)
-        # TUIs expect \r for Enter key presses
-        self.approval_patterns: list[tuple[re.Pattern, bytes, str]] = [
-            # Numbered menu format (Claude, many CLI tools): "1. Yes" / "2. No" (optional 3rd option)
-            # NOTE: Must require BOTH "1. Yes" AND "2. No" to avoid premature matching when
-            # the menu is rendered incrementally (TUIs often send "1. Yes" before "2. No")
-            (re.compile(rf'{menu_prefix}1[\.)]\s*Yes\s+{menu_prefix}2[\.)]\s*No(?:\s+{menu_prefix}3[\.)]\s*[^\n]+)?', re.IGNORECASE | re.MULTILINE), b'\r', "pressing Enter"),
-            # Generic approval prompts with yes/no options (e.g., "Continue? (y/n)")
-            (re.compile(r'(?:Do you want to|Continue|Proceed|Approve|Confirm|Are you sure)\b[^\n]*?\s*(?:\(|\[)?\s*(?:yes\s*/\s*no|y\s*/\s*n)\s*(?:\)|\])?', re.IGNORECASE), b'y\r', "sending 'y' + Enter"),
-            # Terraform style: "Enter a value:"
-            (re.compile(r'Enter a value:\s*$', re.IGNORECASE | re.MULTILINE), b'yes\r', "sending 'yes' + Enter"),
-        ]
-        self.relaxed_approval_patterns: list[tuple[re.Pattern, bytes, str]] = [
-            (re.compile(r'\?\s*(?:\(|\[)?\s*(?:yes|y)\s*/\s*(?:no|n)(?:\s*/\s*[^\s\]\)]+)?\s*(?:\)|\])?', re.IGNORECASE), b'y\r', "sending 'y' + Enter (relaxed)"),
-            (re.compile(r'\bYes\b\s*/\s*\bNo\b\s*/\s*[^\n]+', re.IGNORECASE), b'y\r', "sending 'y' + Enter (relaxed)"),
-        ]
-        self.numbered_menu_pattern = re.compile(
-            r'^\s*(?P<selected>[›❯>➤•*])?\s*(?P<number>\d+)[\.)]\s*(?P<label>Yes|No)\b',
-            re.IGNORECASE,
-        )
-        
+        # Shared module-level patterns; assign per instance to override
+        self.approval_patterns = APPROVAL_PATTERNS
+        self.relaxed_approval_patterns = RELAXED_APPROVAL_PATTERNS
+        self.numbered_menu_pattern = NUMBERED_MENU_PATTERN
+
+    def append_buffer(self, data: bytes):
+        """Append raw output to the buffer, trimming it in place to buffer_limit.
+
+        Deleting from the front of a bytearray only moves its start offset, so
+        trimming is cheap without a hand-rolled ring buffer.
+        """
+        self.buffer += data
+        self.unscanned_bytes += len(data)
+        if len(self.buffer) > self.buffer_limit:
+            del self.buffer[:-self.buffer_limit]
+
+    def buffer_tail(self, size: int) -> str:
+        """Decode the last size bytes of the buffer for pattern matching.
+
+        Output is kept as bytes and only this tail is decoded, so chunks that
+        are never scanned never pay for UTF-8 decoding.
+        """
+        buffer = self.buffer
+        end = len(buffer)
+        start = max(0, end - size)
+        # Don't start decoding in the middle of a multi-byte character
+        while start < end and 0x80 <= buffer[start] < 0xC0:
+            start += 1
+        # Nor end in one: a character split across reads is held back until the
+        # rest of it arrives instead of being decoded as U+FFFD
+        end = complete_utf8_end(buffer, start)
+        # Decode through a view so the tail isn't copied into a new bytearray first.
+        # The view must be released before the buffer is resized again.
+        with memoryview(buffer) as view:
+            return str(view[start:end], 'utf-8', C1_CSI_DECODE_ERRORS)
+
+    def buffer_ends_mid_sequence(self) -> bool:
+        """Whether the buffer ends inside an escape sequence or a UTF-8 character.
+
+        The chunk that finishes either can complete a prompt without bringing
+        any of PROMPT_FINAL_BYTES itself.
+        """
+        buffer = self.buffer
+        end = len(buffer)
+        if complete_utf8_end(buffer, max(0, end - 4)) < end:
+            return True
+        introducer = max(buffer.rfind(b'\x1b'), buffer.rfind(b'\x9b'))
+        if introducer < 0:
+            return False
+        # 0x9B is also a continuation byte ('ě' is C4 9B), so decode from the
+        # start of its character to tell the two apart
+        start = introducer
+        while start > 0 and introducer - start < 3 and buffer[start - 1] >= 0x80:
+            start -= 1
+        with memoryview(buffer) as view:
+            text = str(view[start:], 'utf-8', C1_CSI_DECODE_ERRORS)
+        introducer = max(text.rfind('\x1b'), text.rfind('\x9b'))
+        return introducer >= 0 and ANSI_ESCAPE.match(text, introducer) is None
+
+    def idle_snapshot_hash(self) -> int:
+        """Checksum the last 512 buffered bytes to tell whether output changed.
+
+        Checksums a view of the buffer so no copy of the tail is kept around
+        between idle checks.
+        """
+        with memoryview(self.buffer) as view:
+            return zlib.crc32(view[-512:])
+
     def log(self, message: str):
         """Write a message to the log file"""
         if self.log_file:
             self.log_file.write(message)
-            self.log_file.flush()
     
+    def log_timestamp(self) -> str:
+        """Return the current local time as HH:MM:SS.mmm.
+
+        strftime only runs once per second; in between only milliseconds change.
+        """
+        now = time.time()
+        second = int(now)
+        if second != self._log_second:
+            self._log_second = second
+            self._log_second_prefix = time.strftime("%H:%M:%S", time.localtime(second))
+        millis = min(int((now - second) * 1000), 999)
+        return f"{self._log_second_prefix}.{millis:03d}"
+
     def log_data(self, direction: str, data: bytes):
         """Log raw data with timestamp and direction"""
-        if not self.enable_logging:
-            return
-        
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        timestamp = self.log_timestamp()
         try:
-            text = data.decode('utf-8', errors='replace')
-            # Escape non-printable characters for clarity
-            escaped = repr(text)[1:-1]  # Remove outer quotes
+            if not data.translate(None, LOG_VERBATIM_BYTES):
+                # Nothing to escape: skip building the repr
+                escaped = data.decode('ascii')
+            else:
+                text = data.decode('utf-8', errors='replace')
+                # Escape non-printable characters for clarity
+                escaped = repr(text)[1:-1]  # Remove outer quotes
             self.log(f"[{timestamp}] {direction}: {escaped}\n")
         except Exception as e:
             self.log(f"[{timestamp}] {direction}: <decode error: {e}>\n")
@@ -178,8 +425,32 @@ class AutoYes:
             try:
                 self.stream_log_file.write(data)
             except Exception as e:
-                if self.enable_logging:
-                    self.log(f"[ERROR] Failed to write stream log: {e}\n")
+                self.disable_stream_log(e)
+
+    def flush_logs(self):
+        """Push buffered debug and stream log data to disk."""
+        if self.log_file:
+            self.log_file.flush()
+        self.flush_stream_log()
+
+    def flush_stream_log(self):
+        """Push buffered stream log data to disk."""
+        if self.stream_log_file:
+            try:
+                self.stream_log_file.flush()
+            except Exception as e:
+                self.disable_stream_log(e)
+
+    def disable_stream_log(self, error: Exception):
+        """Stop writing the stream log after a write fails (e.g. disk full)."""
+        if self.enable_logging:
+            self.log(f"[ERROR] Failed to write stream log: {error}\n")
+        stream_log_file, self.stream_log_file = self.stream_log_file, None
+        self.log_stream_data = discard
+        try:
+            stream_log_file.close()
+        except Exception:
+            pass
     
     def print_status(self, message: str, color: str = RESET, *, visible: bool = False):
         """Print a status message to stderr"""
@@ -204,35 +475,60 @@ class AutoYes:
             
     def check_for_approval_prompt(self, text: str, relaxed: bool = False) -> Optional[tuple[bytes, str]]:
         """Check if the text contains an approval prompt"""
-        # Strip ANSI escape codes first for cleaner processing
-        clean_text = ANSI_ESCAPE.sub('', text)
-        # Normalize line endings
-        clean_text = clean_text.replace('\r\n', '\n').replace('\r', '\n')
-        
-        # Filter out empty lines and spinner-only lines to handle TUI animations
-        # that flood the buffer and push the actual prompt out of view
-        all_lines = clean_text.split('\n')
-        # Spinner characters commonly used by TUI apps
-        spinner_chars = set('⏺⏹⏸⏵⏴●○◐◑◒◓◴◵◶◷⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏▁▂▃▄▅▆▇█✓✗✳✴✵')
-        meaningful_lines = [
-            line for line in all_lines 
-            if line.strip() and not all(c in spinner_chars or c.isspace() for c in line)
-        ]
+        # Strip ANSI escape codes first for cleaner processing.
+        # Two substring scans are much cheaper than the regex, so skip it when
+        # no sequence can be present.
+        if '\x1b' in text or '\x9b' in text:
+            clean_text = ANSI_ESCAPE.sub('', text)
+        else:
+            clean_text = text
+        # Normalize line endings. A single replace is enough: the empty line it
+        # leaves behind for each \r\n is dropped with the other blank lines.
+        clean_text = clean_text.replace('\r', '\n')
         
         # Take last N meaningful lines (more lines in relaxed mode for idle check)
         max_lines = 50 if relaxed else 30
-        last_lines = '\n'.join(meaningful_lines[-max_lines:])
+        last_lines = last_meaningful_lines(clean_text, max_lines)
 
-        menu_response = self.match_numbered_menu(last_lines)
-        if menu_response:
-            return menu_response
+        # Redraws that leave the meaningful lines unchanged (spinner frames,
+        # cursor movement) give the same answer as the previous check
+        if self.last_check is not None and self.last_check[0] == relaxed and self.last_check[1] == last_lines:
+            return self.last_check[2]
 
         if self.enable_logging:
             mode = "RELAXED" if relaxed else "STRICT"
-            self.log(f"\n[PATTERN CHECK] Mode: {mode} | Buffer size: {len(text)} chars\n")
+            self.log(f"\n[PATTERN CHECK] Mode: {mode} | Scan window: {len(text)} chars\n")
             self.log(f"[PATTERN CHECK] Last {max_lines} non-empty lines:\n{repr(last_lines)}\n")
-        
-        patterns = self.approval_patterns + (self.relaxed_approval_patterns if relaxed else [])
+
+        response = self.match_approval_prompt(last_lines, relaxed)
+        self.last_check = (relaxed, last_lines, response)
+        return response
+
+    def uses_default_patterns(self, relaxed: bool = False) -> bool:
+        """Whether a check only runs the module-level default patterns.
+
+        Shortcuts derived from those patterns (APPROVAL_HINTS, PROMPT_FINAL_BYTES)
+        would silently skip a custom pattern, so they only apply while this is true.
+        """
+        return (
+            self.approval_patterns is APPROVAL_PATTERNS
+            and self.numbered_menu_pattern is NUMBERED_MENU_PATTERN
+            and (not relaxed or self.relaxed_approval_patterns is RELAXED_APPROVAL_PATTERNS)
+        )
+
+    def match_approval_prompt(self, last_lines: str, relaxed: bool) -> Optional[tuple[bytes, str]]:
+        """Match the approval patterns against already cleaned-up lines"""
+        if self.uses_default_patterns(relaxed):
+            folded = last_lines.casefold()
+            if not any(hint in folded for hint in (RELAXED_APPROVAL_HINTS if relaxed else APPROVAL_HINTS)):
+                return None
+
+        menu_response = self.match_numbered_menu(last_lines)
+        if menu_response:
+            return menu_response
+
+        # Only the idle check pays for joining the tuples
+        patterns = self.approval_patterns + self.relaxed_approval_patterns if relaxed else self.approval_patterns
         for i, (pattern, response, response_label) in enumerate(patterns):
             match = pattern.search(last_lines)
             if match:
@@ -241,21 +537,21 @@ class AutoYes:
                     self.log(f"[PATTERN MATCH] Matched text: {repr(match.group())}\n")
                     self.log(f"[PATTERN MATCH] Response: {response_label} ({response!r})\n")
                 return response, response_label
-            elif self.enable_logging:
-                self.log(f"[PATTERN CHECK] Pattern #{i} no match: {pattern.pattern}\n")
-        
+
+        if self.enable_logging:
+            self.log(f"[PATTERN CHECK] No match ({len(patterns)} patterns tried)\n")
         return None
 
     def match_numbered_menu(self, clean_text: str) -> Optional[tuple[bytes, str]]:
-        options = []
-        for line in clean_text.splitlines():
-            match = self.numbered_menu_pattern.match(line)
-            if match:
-                options.append({
-                    "number": match.group("number"),
-                    "label": match.group("label").lower(),
-                    "selected": bool(match.group("selected")),
-                })
+        # One scan over the text instead of splitting it and matching line by line
+        options = [
+            {
+                "number": match.group("number"),
+                "label": match.group("label").lower(),
+                "selected": bool(match.group("selected")),
+            }
+            for match in self.numbered_menu_pattern.finditer(clean_text)
+        ]
 
         has_yes = any(option["label"] == "yes" for option in options)
         has_no = any(option["label"] == "no" for option in options)
@@ -280,7 +576,7 @@ class AutoYes:
     def auto_respond(self, response: bytes, response_label: str):
         """Send auto-approval response to command"""
         self.print_status(f"Auto-responding: YES ({response_label})", YELLOW)
-        os.write(self.master_fd, response)
+        write_all(self.master_fd, [response])
         if self.enable_logging:
             self.log(f"[AUTO_RESPOND] Sent {response_label} ({response!r})\n")
         
@@ -295,25 +591,35 @@ class AutoYes:
             data = data.replace(b'\x19', b'')
         return data
         
-    def handle_command_output(self, data: bytes) -> Optional[tuple[bytes, str]]:
+    def handle_command_output(self, data: bytes, check_prompt: bool = True) -> Optional[tuple[bytes, str]]:
         """Process command output, checking for approval prompts
         
         Returns a response tuple if an approval prompt was detected (and will be auto-responded)
+
+        With check_prompt=False the data is only buffered; it stays unscanned and
+        is covered by the next check.
         """
         self.log_data("COMMAND_OUTPUT", data)
         self.log_stream_data(data)
         
         # Add to buffer for pattern matching
         try:
-            text = data.decode('utf-8', errors='replace')
-            self.buffer += text
-            if len(self.buffer) > self.buffer_limit:
-                self.buffer = self.buffer[-self.buffer_limit:]
+            scan = self.auto_approve and check_prompt
+            has_final = any(final in data for final in PROMPT_FINAL_BYTES)
+            if scan and not has_final and not self.unscanned_final_byte and self.uses_default_patterns():
+                # Must be decided before data is appended
+                scan = self.buffer_ends_mid_sequence()
+            self.append_buffer(data)
 
-            if self.auto_approve:
-                response = self.check_for_approval_prompt(self.buffer)
+            if scan:
+                scan_size = self.unscanned_bytes + self.scan_overlap
+                self.unscanned_bytes = 0
+                self.unscanned_final_byte = False
+                response = self.check_for_approval_prompt(self.buffer_tail(scan_size))
                 if response:
                     return response
+            elif has_final:
+                self.unscanned_final_byte = True
         except Exception as e:
             # Don't let decoding errors break the proxy
             if self.enable_logging:
@@ -322,9 +628,32 @@ class AutoYes:
         
         return None
 
+    def read_available_output(self) -> tuple[list[bytes], bool]:
+        """Read what the nonblocking PTY has ready, up to max_read_batch bytes.
+
+        Returns the chunks read and whether the command side has closed.
+        """
+        chunks = []
+        total = 0
+        while total < self.max_read_batch:
+            try:
+                chunk = os.read(self.master_fd, self.read_chunk_size)
+            except BlockingIOError:
+                break
+            except OSError:
+                # EIO once every process has closed the child side of the PTY
+                return chunks, True
+            if not chunk:
+                return chunks, True
+            chunks.append(chunk)
+            total += len(chunk)
+        return chunks, False
+
     def clear_buffer(self):
-        self.buffer = ""
-        self.last_idle_snapshot = ""
+        self.buffer.clear()
+        self.unscanned_bytes = 0
+        self.unscanned_final_byte = False
+        self.last_idle_hash = None
             
     def setup_terminal(self):
         """Set terminal to raw mode"""
@@ -383,6 +712,79 @@ class AutoYes:
         if callable(self.previous_sigwinch):
             self.previous_sigwinch(signum, frame)
 
+    def next_wakeup_timeout(self, now_ns: int) -> Optional[float]:
+        """Return how many seconds the I/O loop may sleep before a deadline needs action.
+
+        None means no deadline is pending: the loop blocks until I/O or a signal
+        (child exit, resize) arrives instead of polling.
+        """
+        since_output = now_ns - self.last_output_ns
+        if self.pending_response:
+            return max(0, self.response_delay_ns - since_output) / 1e9
+        if self.auto_approve and self.buffer:
+            idle_remaining = self.idle_prompt_timeout_ns - since_output
+            if idle_remaining > 0:
+                return idle_remaining / 1e9
+            # The deadline may have passed since the loop last looked at the
+            # clock; don't block until the idle check has seen this output
+            if self.idle_snapshot_hash() != self.last_idle_hash:
+                return 0
+        return None
+
+    def handle_sigchld(self, signum, frame):
+        """Only installed so SIGCHLD is delivered and writes to the wakeup pipe."""
+
+    def handle_sigint(self, signum, frame):
+        """Flag SIGINT for the event loop, or interrupt whatever is blocking it.
+
+        While the loop is parked in the selector the flag is enough: the wakeup
+        pipe makes the select return and the loop exits cleanly. Anywhere else,
+        e.g. write_all stuck on a full PTY or a stalled stdout, the interrupted
+        call would just be retried (PEP 475), so raise KeyboardInterrupt.
+        """
+        self.interrupted = True
+        if not self.waiting_for_events:
+            raise KeyboardInterrupt
+
+    def install_signal_wakeup(self):
+        """Make every handled signal wake the selector through a self-pipe."""
+        # os.pipe2 is Linux-only; pipe() fds are already non-inheritable
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_r, False)
+        os.set_blocking(self.wakeup_w, False)
+        self.previous_wakeup_fd = signal.set_wakeup_fd(self.wakeup_w)
+        self.previous_sigchld = signal.signal(signal.SIGCHLD, self.handle_sigchld)
+        self.previous_sigint = signal.signal(signal.SIGINT, self.handle_sigint)
+
+    def restore_signal_wakeup(self):
+        if self.wakeup_w is None:
+            return
+        signal.set_wakeup_fd(self.previous_wakeup_fd)
+        signal.signal(signal.SIGCHLD, self.previous_sigchld)
+        signal.signal(signal.SIGINT, self.previous_sigint)
+        for fd in (self.wakeup_r, self.wakeup_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.wakeup_r = self.wakeup_w = None
+
+    def drain_wakeup_pipe(self):
+        try:
+            while os.read(self.wakeup_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def reap_child(self, pid: int):
+        """Record the child's exit status if it has exited."""
+        try:
+            done_pid, status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if done_pid == pid:
+            self.child_status = status
+
     def install_resize_handler(self):
         self.previous_sigwinch = signal.getsignal(signal.SIGWINCH)
         signal.signal(signal.SIGWINCH, self.handle_sigwinch)
@@ -413,86 +815,137 @@ class AutoYes:
             # Execute the command
             os.execvp(self.command[0], self.command)
         else:  # Parent process
+            selector = None
             try:
                 self.sync_pty_winsize(initial_winsize)
+                # Reads drain the PTY until EAGAIN (see read_available_output)
+                os.set_blocking(self.master_fd, False)
                 self.install_resize_handler()
+                self.install_signal_wakeup()
+                # The child may have exited before SIGCHLD was being handled
+                self.reap_child(pid)
                 self.setup_terminal()
-                self.last_output_time = time.monotonic()
+                self.last_output_ns = time.monotonic_ns()
+                # Looked up once; the loop writes straight to the fds, bypassing
+                # Python's buffered sys.stdout (so no flush is needed either)
+                self.stdin_fd = sys.stdin.fileno()
+                self.stdout_fd = sys.stdout.fileno()
+
+                # Register the fds once; epoll/kqueue avoid rebuilding an fd_set per wakeup
+                selector = open_read_selector([self.stdin_fd, self.master_fd, self.wakeup_r])
 
-                # Single-threaded I/O loop using select on both stdin and PTY
+                # Functions called on every iteration, bound to fast locals
+                monotonic_ns = time.monotonic_ns
+                wait_for_events = selector.select
+
+                # Single-threaded I/O loop waiting on stdin, the PTY and signals
                 while True:
-                    # Wait for input from either user or command (with timeout for idle check)
+                    # Wait for input from either user or command, waking for the next deadline
+                    if self.child_status is not None:
+                        # Child is gone: only forward output still queued in the PTY
+                        timeout = 0
+                    else:
+                        timeout = self.next_wakeup_timeout(monotonic_ns())
+                    if timeout is None:
+                        # About to block indefinitely; write out the logs first
+                        self.flush_logs()
+                    self.waiting_for_events = True
                     try:
-                        r, _, _ = select.select([sys.stdin, self.master_fd], [], [], 0.1)
+                        r = {key.fileobj for key, _ in wait_for_events(timeout)}
                     except InterruptedError:
                         continue
+                    finally:
+                        self.waiting_for_events = False
+
+                    # Checked on every pass: the wakeup byte may have been drained
+                    # before the Python-level handler ran
+                    if self.interrupted:
+                        self.print_status("Interrupted by user", YELLOW)
+                        break
 
-                    if sys.stdin in r:
+                    if not r:
+                        if self.child_status is not None:
+                            break
+                        # Output has gone quiet; a good moment to write out the logs
+                        self.flush_logs()
+
+                    if self.wakeup_r in r:
+                        self.drain_wakeup_pipe()
+                        if self.child_status is None:
+                            self.reap_child(pid)
+
+                    if self.stdin_fd in r:
                         # User input
                         try:
-                            data = os.read(sys.stdin.fileno(), self.read_chunk_size)
+                            data = os.read(self.stdin_fd, self.read_chunk_size)
                             if not data:
                                 break
                             data = self.handle_user_input(data)
                             if data:
-                                os.write(self.master_fd, data)
+                                write_all(self.master_fd, [data])
                         except OSError:
                             break
 
                     if self.master_fd in r:
-                        # Command output - use smaller reads to catch prompts before spinner floods
-                        try:
-                            data = os.read(self.master_fd, 4096)
-                            if not data:
-                                break
-                            
-                            self.last_output_time = time.monotonic()
-                            
+                        # Command output - drain everything that is ready so a burst
+                        # costs one pattern check and one terminal write
+                        chunks, closed = self.read_available_output()
+                        if chunks:
+                            data = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+                            self.last_output_ns = monotonic_ns()
+
                             # Check for approval prompt BEFORE adding to buffer
-                            # This catches the prompt even if spinner data follows in same chunk
-                            response = self.handle_command_output(data)
-                            
+                            # This catches the prompt even if spinner data follows in same chunk.
+                            # A batch that hit max_read_batch is still mid-stream and more
+                            # output is already waiting, so the check is left to that read.
+                            response = self.handle_command_output(data, len(data) < self.max_read_batch)
+
                             # Forward output to user
-                            os.write(sys.stdout.fileno(), data)
-                            sys.stdout.flush()
-                            
+                            try:
+                                write_all(self.stdout_fd, [data])
+                            except OSError:
+                                break
+
                             # Queue auto-response to be sent after TUI settles
                             if response and not self.pending_response:
                                 self.pending_response = response
                                 if self.enable_logging:
                                     self.log(f"[PENDING] Queued response: {response[1]}\n")
-                                
-                        except OSError:
+                        if closed:
                             break
 
                     # Check if we should send a pending response
-                    # Wait for TUI to settle (no output for response_delay time)
-                    now = time.monotonic()
-                    if self.pending_response and (now - self.last_output_time) >= self.response_delay:
+                    # Wait for TUI to settle (no output for response_delay_ns)
+                    now = monotonic_ns()
+                    if self.pending_response and (now - self.last_output_ns) >= self.response_delay_ns:
                         if self.enable_logging:
                             self.log(f"[SENDING] TUI settled, sending response: {self.pending_response[1]}\n")
-                        sys.stdout.flush()
+                        self.flush_logs()
                         self.auto_respond(self.pending_response[0], self.pending_response[1])
                         self.clear_buffer()
                         self.pending_response = None
-                        self.last_output_time = now
+                        self.last_output_ns = now
                     
                     # Idle check - if no output for a while, do a relaxed pattern check
                     elif self.auto_approve and self.buffer and not self.pending_response:
-                        if (now - self.last_output_time) >= self.idle_prompt_timeout:
-                            snapshot = self.buffer[-512:]
-                            if snapshot != self.last_idle_snapshot:
-                                response = self.check_for_approval_prompt(self.buffer, relaxed=True)
+                        if (now - self.last_output_ns) >= self.idle_prompt_timeout_ns:
+                            snapshot = self.idle_snapshot_hash()
+                            if snapshot != self.last_idle_hash:
+                                response = self.check_for_approval_prompt(self.buffer_tail(self.buffer_limit), relaxed=True)
                                 if response:
                                     if self.enable_logging:
                                         self.log("[IDLE CHECK] Triggered relaxed approval check\n")
                                     self.pending_response = response
                                 else:
-                                    self.last_idle_snapshot = snapshot
+                                    self.last_idle_hash = snapshot
                             
             except KeyboardInterrupt:
+                # SIGINT outside the selector wait (see handle_sigint)
                 self.print_status("Interrupted by user", YELLOW)
             finally:
+                if selector:
+                    selector.close()
+                self.restore_signal_wakeup()
                 self.restore_resize_handler()
                 self.restore_terminal()
                 
@@ -503,10 +956,11 @@ class AutoYes:
                     pass
                     
                 # Wait for child process
-                try:
-                    os.waitpid(pid, 0)
-                except:
-                    pass
+                if self.child_status is None:
+                    try:
+                        os.waitpid(pid, 0)
+                    except:
+                        pass
                     
                 self.print_status("Session ended", BLUE)
                 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import os
+import pty
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from autoyes import AutoYes, write_all
+
+
+class WriteAllTests(unittest.TestCase):
+    def test_write_all_retries_short_writes(self):
+        read_fd, write_fd = os.pipe()
+        real_writev = os.writev
+        try:
+            # Accept at most 3 bytes per call, like a terminal that is falling behind
+            with mock.patch("autoyes.os.writev", side_effect=lambda fd, bufs: real_writev(fd, [bytes(bufs[0][:3])])):
+                write_all(write_fd, [b"hello", b"", b" world"])
+            self.assertEqual(os.read(read_fd, 100), b"hello world")
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_sigint_interrupts_write_blocked_on_full_fd(self):
+        proxy = AutoYes(["true"])
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(write_fd, False)
+        proxy.install_signal_wakeup()
+        interrupt = threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGINT))
+        # If SIGINT doesn't get through, closing the reader ends the write with
+        # BrokenPipeError instead of hanging the test run
+        rescue = threading.Timer(3, os.close, (read_fd,))
+        try:
+            interrupt.start()
+            rescue.start()
+            # Nobody reads the pipe, so this blocks once it is full
+            with self.assertRaises(KeyboardInterrupt):
+                write_all(write_fd, [b"x" * (1 << 20)])
+            self.assertTrue(proxy.interrupted)
+        finally:
+            interrupt.cancel()
+            rescue.cancel()
+            proxy.restore_signal_wakeup()
+            for fd in (read_fd, write_fd):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+
+class EventLoopTests(unittest.TestCase):
+    def setUp(self):
+        self.proxy = AutoYes(["true"])
+
+    def test_read_available_output_drains_until_empty_or_closed(self):
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        self.proxy.master_fd = read_fd
+        try:
+            os.write(write_fd, b"a" * 10000)
+            chunks, closed = self.proxy.read_available_output()
+            self.assertEqual(b"".join(chunks), b"a" * 10000)
+            self.assertFalse(closed)
+
+            os.close(write_fd)
+            write_fd = None
+            self.assertEqual(self.proxy.read_available_output(), ([], True))
+        finally:
+            os.close(read_fd)
+            if write_fd is not None:
+                os.close(write_fd)
+
+    def test_sigint_while_waiting_for_events_only_sets_the_flag(self):
+        self.proxy.install_signal_wakeup()
+        try:
+            self.proxy.waiting_for_events = True
+            os.kill(os.getpid(), signal.SIGINT)
+            self.assertTrue(self.proxy.interrupted)
+        finally:
+            self.proxy.restore_signal_wakeup()
+
+    def test_run_exits_on_sigint_while_input_is_stuck(self):
+        # The child never reads, so forwarding pasted input fills the PTY
+        child = "import sys, time, tty; tty.setraw(0); print('ready', flush=True); time.sleep(30)"
+        script = Path(__file__).with_name("autoyes.py")
+        # Keep autoyes from writing its stream log under the real home directory
+        home = tempfile.TemporaryDirectory()
+        self.addCleanup(home.cleanup)
+        pid, fd = pty.fork()
+        if pid == 0:
+            os.environ["HOME"] = home.name
+            os.execv(sys.executable, [sys.executable, str(script), sys.executable, "-c", child])
+        os.set_blocking(fd, False)
+        try:
+            # Once the child's line comes through, autoyes is in its event loop
+            output = b""
+            deadline = time.monotonic() + 5
+            while b"ready" not in output and time.monotonic() < deadline:
+                try:
+                    output += os.read(fd, 65536)
+                except BlockingIOError:
+                    time.sleep(0.01)
+            self.assertIn(b"ready", output, "autoyes did not start the command")
+
+            pasted = b"x" * 40000
+            deadline = time.monotonic() + 1
+            while pasted and time.monotonic() < deadline:
+                try:
+                    pasted = pasted[os.write(fd, pasted):]
+                except BlockingIOError:
+                    time.sleep(0.01)
+
+            os.kill(pid, signal.SIGINT)
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                try:
+                    os.read(fd, 65536)
+                except OSError:
+                    pass
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    pid = None
+                    break
+                time.sleep(0.01)
+            self.assertIsNone(pid, "autoyes kept running after SIGINT")
+        finally:
+            if pid is not None:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            os.close(fd)
+
+    def test_wakeup_timeout_waits_for_idle_check_of_new_output(self):
+        self.proxy.append_buffer(b"Save changes? [y/n]")
+        self.proxy.last_output_ns = 0
+        now_ns = self.proxy.idle_prompt_timeout_ns + 1
+
+        self.assertEqual(self.proxy.next_wakeup_timeout(now_ns), 0)
+
+        self.proxy.last_idle_hash = self.proxy.idle_snapshot_hash()
+        self.assertIsNone(self.proxy.next_wakeup_timeout(now_ns))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import re
 import unittest
 
 from autoyes import AutoYes
@@ -52,6 +53,108 @@ Would you like to run the following command?
 
         self.assertIsNone(self.proxy.check_for_approval_prompt(prompt))
 
+    def test_strips_8bit_csi_sequences(self):
+        # A terminal using 8-bit controls sends CSI as a raw 0x9B byte
+        output = b"Do you want to proceed?\n\x9b7m" + "›".encode() + b" 1. Yes\x9b0m\n  2. No\n"
+
+        self.assertEqual(
+            self.proxy.handle_command_output(output),
+            (b"\r", "pressing Enter"),
+        )
+
+    def test_0x9b_inside_a_character_is_not_treated_as_csi(self):
+        self.proxy.append_buffer("Přeskočit ě".encode())
+
+        self.assertEqual(self.proxy.buffer_tail(100), "Přeskočit ě")
+
+    def test_custom_pattern_is_not_skipped_by_keyword_prefilter(self):
+        self.proxy.approval_patterns = self.proxy.approval_patterns + (
+            (re.compile(r"Overwrite\?"), b"y\r", "custom"),
+        )
+
+        self.assertEqual(self.proxy.check_for_approval_prompt("Overwrite?"), (b"y\r", "custom"))
+
+    def test_custom_pattern_is_checked_on_every_chunk(self):
+        self.proxy.approval_patterns = self.proxy.approval_patterns + (
+            (re.compile(r"Replace file\?"), b"y\r", "custom"),
+        )
+
+        self.assertEqual(self.proxy.handle_command_output(b"Replace file?"), (b"y\r", "custom"))
+
+    def test_space_padded_line_does_not_backtrack_catastrophically(self):
+        # TUIs pad lines to the terminal width; this used to take ~1 minute
+        self.assertIsNone(self.proxy.check_for_approval_prompt("Continue" + " " * 3000 + "x", relaxed=True))
+
+    def test_detects_menu_split_across_output_chunks(self):
+        self.assertIsNone(self.proxy.handle_command_output(b"x" * 8192 + b"Do you want to proceed?\n\xe2\x80\xba 1. Yes\n"))
+        self.assertEqual(
+            self.proxy.handle_command_output(b"  2. No\n"),
+            (b"\r", "pressing Enter"),
+        )
+
+    def test_deferred_output_is_scanned_by_the_next_check(self):
+        self.assertIsNone(self.proxy.handle_command_output(b"Proceed? (y/n)\n", check_prompt=False))
+        self.assertEqual(
+            self.proxy.handle_command_output(b"scanning\n"),
+            (b"y\r", "sending 'y' + Enter"),
+        )
+
+    def test_chunk_without_prompt_final_character_after_a_check_is_not_scanned(self):
+        self.assertIsNone(self.proxy.handle_command_output(b"Proceed? (y/"))
+        self.assertIsNone(self.proxy.handle_command_output(b"\x1b[K"))
+        self.assertEqual(self.proxy.unscanned_bytes, 3)
+
+        self.assertEqual(
+            self.proxy.handle_command_output(b"n)"),
+            (b"y\r", "sending 'y' + Enter"),
+        )
+
+    def test_chunk_finishing_an_escape_sequence_is_scanned(self):
+        self.assertIsNone(self.proxy.handle_command_output(b"Enter a value: \x1b["))
+        self.assertEqual(
+            self.proxy.handle_command_output(b"K"),
+            (b"yes\r", "sending 'yes' + Enter"),
+        )
+
+    def test_deferred_prompt_is_scanned_by_a_chunk_without_final_character(self):
+        self.assertIsNone(
+            self.proxy.handle_command_output(b"y" * 70000 + b"\nProceed? (y/n) ", check_prompt=False)
+        )
+        self.assertEqual(
+            self.proxy.handle_command_output(b"\x1b[?25h"),
+            (b"y\r", "sending 'y' + Enter"),
+        )
+
+    def test_spinner_redraw_repeats_previous_result(self):
+        prompt = "Proceed? (y/n)\n"
+        first = self.proxy.check_for_approval_prompt(prompt)
+
+        self.assertEqual(first, (b"y\r", "sending 'y' + Enter"))
+        self.assertEqual(self.proxy.check_for_approval_prompt(prompt + "\x1b[2K\r⠋\n"), first)
+
+    def test_buffer_keeps_only_the_most_recent_output(self):
+        self.proxy.buffer_limit = 10
+        for chunk in (b"abcd", b"efgh", b"ijkl", b"mnop"):
+            self.proxy.append_buffer(chunk)
+
+        self.assertEqual(self.proxy.buffer, b"ghijklmnop")
+
+        self.proxy.clear_buffer()
+        self.assertEqual(self.proxy.buffer, b"")
+
+    def test_buffer_tail_does_not_start_mid_character(self):
+        self.proxy.append_buffer("› 1. Yes".encode())
+
+        self.assertEqual(self.proxy.buffer_tail(9), " 1. Yes")
+
+    def test_buffer_tail_holds_back_character_split_across_reads(self):
+        marker = "›".encode()
+        self.proxy.append_buffer(b"Enter a value: " + marker[:2])
+        self.assertEqual(self.proxy.buffer_tail(100), "Enter a value: ")
+
+        self.proxy.append_buffer(marker[2:])
+        self.assertEqual(self.proxy.buffer_tail(100), "Enter a value: ›")
+
 
 if __name__ == "__main__":
     unittest.main()